@@ -13,22 +13,31 @@ Features:
 - Clean placeholders in sidebar form
 """
 
+import base64
+import functools
+import html
 import io
+import json
 import math
 import os
-import tempfile
+import re
+import threading
+from collections import OrderedDict
 from datetime import datetime
 from typing import Optional
 
+import bson
 import gridfs
 from bson import ObjectId
+from PIL import Image, ImageOps
 from pymongo import MongoClient, ASCENDING, DESCENDING
-from pymongo.errors import DuplicateKeyError
+from pymongo.errors import DuplicateKeyError, OperationFailure
 import streamlit as st
 
 # -------------------------
 # Helpers
 # -------------------------
+@functools.lru_cache(maxsize=4096)
 def norm(s: str) -> str:
     """Normalize IDs for case-insensitive uniqueness & display."""
     return (s or "").strip().upper()
@@ -40,35 +49,123 @@ def norm(s: str) -> str:
 def get_db():
     uri = os.getenv("MONGODB_URI", "mongodb://localhost:27017/")
     db_name = os.getenv("MONGODB_DB", "meters_db")
-    client = MongoClient(uri)
+    # One client per process, shared by all sessions (its pool is thread-safe).
+    # Bounded pool + short timeouts so a busy or unreachable server fails fast;
+    # compressors are negotiated and skipped if the library isn't installed.
+    client = MongoClient(
+        uri,
+        maxPoolSize=20,
+        minPoolSize=2,
+        serverSelectionTimeoutMS=2000,
+        connectTimeoutMS=2000,
+        socketTimeoutMS=10000,
+        compressors="zstd,snappy",
+    )
     return client[db_name]
 
-def get_fs(db):
-    return gridfs.GridFS(db)
+@st.cache_resource(show_spinner=False)
+def get_fs(_db):
+    return gridfs.GridFS(_db)
 
 # -------------------------
 # Data access layer
 # -------------------------
-def ensure_indexes(db):
+# Fields a card renders, plus the *_norm sort keys for keyset page boundaries
+LIST_PROJECTION = {
+    "meter_id": 1, "consumer_id": 1, "meter_id_norm": 1, "consumer_id_norm": 1,
+    "value": 1, "image_file_id": 1, "created_at": 1, "updated_at": 1,
+}
+# "Sort by" option -> document field
+SORT_FIELDS = {
+    "Created": "_id",  # ObjectIds are time-ordered; the primary key index is free
+    "Meter ID": "meter_id_norm",
+    "Consumer ID": "consumer_id_norm",
+    "Value": "value",
+}
+# Index backing each sort field (hinted on unfiltered pages). Non-unique
+# fields carry an _id tie-break so keyset pagination has a total order.
+SORT_INDEXES = {
+    "_id": [("_id", ASCENDING)],
+    "meter_id_norm": [("meter_id_norm", ASCENDING)],
+    "consumer_id_norm": [("consumer_id_norm", ASCENDING)],
+    "value": [("value", DESCENDING), ("_id", ASCENDING)],
+}
+
+@st.cache_resource(show_spinner=False)
+def ensure_indexes(_db) -> bool:
     """
     Uniqueness on normalized fields so IDs are case-insensitive.
-    Keeping older exact-case indexes is fine, but the *_norm ones are what we use.
+    Search, filter and sort all run against the *_norm indexes, so the older
+    exact-case indexes are dropped to keep the planner on the anchored plans.
+    Cached so it runs once per process, not on every rerun.
     """
-    db.meters.create_index([("meter_id_norm", ASCENDING)], unique=True, name="uniq_meter_norm")
-    db.meters.create_index([("consumer_id_norm", ASCENDING)], unique=True, name="uniq_consumer_norm")
-    # Legacy indexes (safe if they already exist)
-    db.meters.create_index([("meter_id", ASCENDING)], unique=True, name="uniq_meter_id")
-    db.meters.create_index([("consumer_id", ASCENDING)], unique=True, name="uniq_consumer")
-    db.meters.create_index([("created_at", DESCENDING)])
+    _db.meters.create_index([("meter_id_norm", ASCENDING)], unique=True, name="uniq_meter_norm")
+    _db.meters.create_index([("consumer_id_norm", ASCENDING)], unique=True, name="uniq_consumer_norm")
+    # Legacy / superseded indexes (ignore if they were never created)
+    for legacy in ("uniq_meter_id", "uniq_consumer", "created_at_-1"):
+        try: _db.meters.drop_index(legacy)
+        except OperationFailure: pass
+    _db.meters.create_index([("value", DESCENDING), ("_id", ASCENDING)])
+    # Same spec GridFS creates on first write; needed for the batched chunk reads
+    _db.fs.chunks.create_index([("files_id", ASCENDING), ("n", ASCENDING)], unique=True)
+    return True
 
 def save_image(fs: gridfs.GridFS, image_file) -> ObjectId:
-    return fs.put(image_file.getvalue(), filename=image_file.name, contentType=image_file.type)
+    # UploadedFile is file-like: GridFS reads it in chunkSize blocks, no full copy
+    image_file.seek(0)
+    return fs.put(image_file, filename=image_file.name, contentType=image_file.type)
 
-def get_image_bytes(fs: gridfs.GridFS, file_id: ObjectId) -> Optional[bytes]:
+def _fetch_images(db, ids: list) -> dict:
+    """
+    Read GridFS files in two queries (files + chunks) instead of one `fs.get`
+    per file. Returns {file_id_str: bytes}; unreadable files are left out.
+    """
     try:
-        return fs.get(file_id).read()
+        lengths = {f["_id"]: f["length"] for f in db.fs.files.find({"_id": {"$in": ids}}, {"length": 1})}
+        parts = {}
+        # Raw batches hand back whole server batches as BSON bytes; each chunk is still decoded below
+        batches = db.fs.chunks.find_raw_batches({"files_id": {"$in": ids}}, {"files_id": 1, "n": 1, "data": 1}).sort(
+            [("files_id", ASCENDING), ("n", ASCENDING)]
+        )
+        for batch in batches:
+            for chunk in bson.decode_iter(batch):
+                parts.setdefault(chunk["files_id"], []).append(chunk["data"])
     except Exception:
-        return None
+        return {}
+    out = {}
+    for fid, length in lengths.items():
+        data = b"".join(parts.get(fid, []))
+        if len(data) == length:  # skip files with missing chunks
+            out[str(fid)] = data
+    return out
+
+THUMB_CACHE_MAX = 512
+
+@st.cache_resource(show_spinner=False)
+def _thumb_cache() -> tuple:
+    """Process-wide LRU of {file_id_str: thumbnail bytes} (GridFS files are immutable) and its lock."""
+    return threading.Lock(), OrderedDict()
+
+def get_thumbs(db, file_id_strs) -> dict:
+    """
+    Card-grid thumbnails per file id. Originals are read (one `$in` for all of
+    the page's misses) only when a thumbnail isn't cached yet, and are not kept.
+    """
+    lock, cache = _thumb_cache()
+    with lock:
+        out = {i: cache[i] for i in file_id_strs if i in cache}
+        for i in out:
+            cache.move_to_end(i)
+    missing = [ObjectId(i) for i in file_id_strs if i not in out]
+    if missing:
+        thumbs = {i: make_thumb(raw) for i, raw in _fetch_images(db, missing).items()}
+        fetched = {i: t for i, t in thumbs.items() if t is not None}  # undecodable images aren't cached
+        out.update(fetched)
+        with lock:
+            cache.update(fetched)
+            while len(cache) > THUMB_CACHE_MAX:
+                cache.popitem(last=False)
+    return out
 
 def insert_meter(db, fs, meter_id: str, consumer_id: str, value: float, image_file) -> ObjectId:
     # Mandatory checks
@@ -84,19 +181,6 @@ def insert_meter(db, fs, meter_id: str, consumer_id: str, value: float, image_fi
     meter_id_n = norm(meter_id)
     consumer_id_n = norm(consumer_id)
 
-    # Duplicate pre-check (case-insensitive)
-    hit = db.meters.find_one(
-        {"$or": [{"meter_id_norm": meter_id_n}, {"consumer_id_norm": consumer_id_n}]},
-        {"meter_id_norm": 1, "consumer_id_norm": 1}
-    )
-    if hit:
-        if hit.get("meter_id_norm") == meter_id_n and hit.get("consumer_id_norm") == consumer_id_n:
-            raise ValueError("Duplicate not allowed: this Meter ID AND Consumer ID already exist (case-insensitive).")
-        if hit.get("meter_id_norm") == meter_id_n:
-            raise ValueError("Duplicate not allowed: this Meter ID already exists (case-insensitive).")
-        if hit.get("consumer_id_norm") == consumer_id_n:
-            raise ValueError("Duplicate not allowed: this Consumer ID already exists (case-insensitive).")
-
     img_id = save_image(fs, image_file)
     doc = {
         # Store display fields in UPPERCASE so cards show uppercase
@@ -110,197 +194,344 @@ def insert_meter(db, fs, meter_id: str, consumer_id: str, value: float, image_fi
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow(),
     }
+    # Unique *_norm indexes are the duplicate check (case-insensitive); no pre-query
     try:
         res = db.meters.insert_one(doc)
     except DuplicateKeyError as e:
-        msg = str(e)
-        if "uniq_meter_norm" in msg:
-            raise ValueError("Duplicate not allowed: this Meter ID already exists (case-insensitive).")
-        if "uniq_consumer_norm" in msg:
+        try: fs.delete(img_id)
+        except Exception: pass
+        # The server reports only the first violated index; one lookup on this
+        # (rare) path tells whether the other ID is taken too.
+        key_pattern = (e.details or {}).get("keyPattern", {})
+        if "meter_id_norm" in key_pattern or "consumer_id_norm" in key_pattern:
+            meter_hit = "meter_id_norm" in key_pattern or db.meters.find_one({"meter_id_norm": meter_id_n}, {"_id": 1})
+            consumer_hit = "consumer_id_norm" in key_pattern or db.meters.find_one({"consumer_id_norm": consumer_id_n}, {"_id": 1})
+            if meter_hit and consumer_hit:
+                raise ValueError("Duplicate not allowed: this Meter ID AND Consumer ID already exist (case-insensitive).")
+            if meter_hit:
+                raise ValueError("Duplicate not allowed: this Meter ID already exists (case-insensitive).")
             raise ValueError("Duplicate not allowed: this Consumer ID already exists (case-insensitive).")
-        if "uniq_meter_id" in msg:
-            raise ValueError("Duplicate not allowed: this exact Meter ID already exists.")
-        if "uniq_consumer" in msg:
-            raise ValueError("Duplicate not allowed: this exact Consumer ID already exists.")
         raise ValueError("Duplicate not allowed: a meter already exists with the same ID(s).")
+    _count.clear()
     return res.inserted_id
 
 def update_value(db, _id: ObjectId, new_value: float):
     db.meters.update_one({"_id": _id}, {"$set": {"value": float(new_value), "updated_at": datetime.utcnow()}})
 
 def delete_meter(db, fs, _id: ObjectId) -> bool:
-    doc = db.meters.find_one({"_id": _id})
+    doc = db.meters.find_one({"_id": _id}, {"image_file_id": 1})
     if not doc: return False
     img_id = doc.get("image_file_id")
     if img_id:
         try: fs.delete(img_id)
         except Exception: pass
-    return db.meters.delete_one({"_id": _id}).deleted_count == 1
+    deleted = db.meters.delete_one({"_id": _id}).deleted_count == 1
+    _count.clear()
+    return deleted
 
-def query_meters(db, q: str, consumer_filter: str, sort_by: str, sort_dir: str, page: int, page_size: int):
-    filters = {}
-    if q:
-        filters["$or"] = [
-            {"meter_id": {"$regex": q, "$options": "i"}},
-            {"consumer_id": {"$regex": q, "$options": "i"}},
-        ]
-    if consumer_filter:
-        filters["consumer_id"] = {"$regex": f"^{consumer_filter}$", "$options": "i"}
-
-    sort_field = {
-        "Created": ("created_at", DESCENDING),
-        "Meter ID": ("meter_id", ASCENDING),
-        "Consumer ID": ("consumer_id", ASCENDING),
-        "Value": ("value", DESCENDING),
-    }[sort_by]
-    direction = DESCENDING if sort_dir == "↓" else ASCENDING
+@st.cache_data(ttl=30, show_spinner=False)
+def _count(_db, filters_json: str) -> int:
+    """Filtered count, cached per canonical filter JSON (`_db` is not hashed); cleared on insert/delete."""
+    return _db.meters.count_documents(json.loads(filters_json))
 
-    total_matching = db.meters.count_documents(filters)
-    cursor = db.meters.find(filters).sort([(sort_field[0], direction)]).skip(page * page_size).limit(page_size)
-    return list(cursor), total_matching
+def sort_spec_for(sort_by: str, sort_dir: str) -> list:
+    """Sort keys for the list query, oriented so the backing index can be walked either way."""
+    direction = DESCENDING if sort_dir == "↓" else ASCENDING
+    index = SORT_INDEXES[SORT_FIELDS[sort_by]]
+    flip = direction != index[0][1]
+    return [(f, -d if flip else d) for f, d in index]
+
+def page_boundary(doc: dict, sort_spec: list) -> tuple:
+    """Sort-key values of the last doc on a page; the keyset for the next page."""
+    return tuple(doc.get(f) for f, _ in sort_spec)
+
+def _after(sort_spec: list, boundary: tuple) -> dict:
+    """Range filter selecting docs strictly after `boundary` in `sort_spec` order."""
+    op = lambda d: "$gt" if d == ASCENDING else "$lt"
+    (f1, d1), v1 = sort_spec[0], boundary[0]
+    if len(sort_spec) == 1:
+        return {f1: {op(d1): v1}}
+    (f2, d2), v2 = sort_spec[1], boundary[1]
+    return {"$or": [{f1: {op(d1): v1}}, {f1: v1, f2: {op(d2): v2}}]}
+
+def query_meters(db, q: str, consumer_filter: str, sort_by: str, sort_dir: str, page: int, page_size: int,
+                 after: Optional[tuple] = None, total_all: Optional[int] = None):
+    """
+    One page of meters plus the matching count. When `after` (the previous
+    page's `page_boundary`) is given, the page is fetched by keyset range on
+    the sort index; otherwise it falls back to skip(page * page_size).
+    `total_all` (if already known) is reused as the count when nothing is filtered.
+    """
+    # IDs are stored UPPERCASE in *_norm, so an anchored, case-sensitive prefix
+    # regex on those fields is an index range scan instead of a collection scan.
+    # User input is escaped, so it can only ever be a literal prefix (no
+    # wildcards or backtracking patterns reach the server).
+    filters = {}
+    qn, cn = norm(q), norm(consumer_filter)
+    if qn:
+        prefix = {"$regex": f"^{re.escape(qn)}"}
+        filters["$or"] = [{"meter_id_norm": prefix}, {"consumer_id_norm": prefix}]
+    if cn:
+        filters["consumer_id_norm"] = cn
+
+    sort_spec = sort_spec_for(sort_by, sort_dir)
+
+    if filters:
+        total_matching = _count(db, json.dumps(filters, sort_keys=True))
+    elif total_all is not None:
+        total_matching = total_all
+    else:
+        total_matching = db.meters.estimated_document_count()
+
+    # Count and page stay separate queries rather than one $facet aggregation:
+    # $facet stages never use indexes, so its page would be a blocking in-memory
+    # sort over every match (short prefixes can match the whole collection), and
+    # the keyset range could only be applied after that sort.
+    page_filters = filters
+    if after is not None:
+        page_filters = {"$and": [filters, _after(sort_spec, after)]} if filters else _after(sort_spec, after)
+    cursor = db.meters.find(page_filters, LIST_PROJECTION).sort(sort_spec)
+    if not filters:
+        # Filtered queries are left to the planner: the *_norm prefix/equality
+        # scans are usually more selective than walking a whole sort index.
+        cursor = cursor.hint(SORT_INDEXES[sort_spec[0][0]])
+    if after is None:
+        cursor = cursor.skip(page * page_size)
+    return list(cursor.limit(page_size)), total_matching
 
 # -------------------------
-# PDF generator (ReportLab → FPDF fallback)
+# PDF generator (FPDF → ReportLab fallback)
 # -------------------------
+def _fpdf_meter_pdf(doc: dict, img_bytes: Optional[bytes]) -> bytes:
+    """Same layout as the ReportLab renderer: rounded meter box, details, image fitted on page 1."""
+    from fpdf import FPDF
+    pt = 25.4 / 72  # layout constants below are the ReportLab ones (points); FPDF works in mm
+    pdf = FPDF(orientation="P", unit="mm", format="A4")
+    pdf.add_page()
+    W, H = pdf.w, pdf.h
+    margin = 18
+    x = margin
+    y = margin
+
+    box_w = W - 2 * margin
+    box_h = H - 2 * margin
+    pdf.set_line_width(1.2 * pt)
+    pdf.set_draw_color(0x44, 0x44, 0x44)
+    pdf.rect(x, y, box_w, box_h, round_corners=True, corner_radius=8)
+
+    pdf.set_font("Helvetica", "B", 16)
+    pdf.text(x + 10 * pt, y + 25 * pt, "Meter Details")
+
+    line_y = y + 50 * pt
+    line_gap = 16 * pt
+    def kv(label, value):
+        nonlocal line_y
+        pdf.set_font("Helvetica", "B", 11)
+        pdf.text(x + 12 * pt, line_y, f"{label}:")
+        pdf.set_font("Helvetica", "", 11)
+        pdf.text(x + 120 * pt, line_y, f"{value}")
+        line_y += line_gap
+
+    created = doc.get("created_at"); updated = doc.get("updated_at")
+    created_s = created.strftime("%Y-%m-%d %H:%M UTC") if created else "-"
+    updated_s = updated.strftime("%Y-%m-%d %H:%M UTC") if updated else "-"
+    kv("Meter ID", doc.get("meter_id", "-"))
+    kv("Consumer ID", doc.get("consumer_id", "-"))
+    kv("Value", doc.get("value", "-"))
+    kv("Created", created_s); kv("Updated", updated_s)
+
+    if img_bytes:
+        try:
+            iw, ih = Image.open(io.BytesIO(img_bytes)).size
+            img_top = line_y + 10 * pt
+            img_bottom = y + box_h - 20 * pt
+            max_w = box_w - 24 * pt
+            max_h = img_bottom - img_top
+            ratio = min(max_w / iw, max_h / ih)
+            disp_w = iw * ratio
+            disp_h = ih * ratio
+            img_x = x + (box_w - disp_w) / 2
+            pdf.image(io.BytesIO(img_bytes), x=img_x, y=img_bottom - disp_h, w=disp_w, h=disp_h)
+        except Exception:
+            pass
+    # fpdf2 returns the document as a bytearray; no latin-1 transcoding pass
+    return bytes(pdf.output())
+
+def _reportlab_meter_pdf(doc: dict, img_bytes: Optional[bytes]) -> bytes:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.units import mm
+    from reportlab.lib.utils import ImageReader
+    from reportlab.lib import colors
+
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=A4)
+    W, H = A4
+    margin = 18 * mm
+    x = margin
+    y = H - margin
+
+    box_w = W - 2 * margin
+    box_h = H - 2 * margin
+    c.setLineWidth(1.2)
+    c.setStrokeColor(colors.HexColor("#444444"))
+    c.roundRect(x, y - box_h, box_w, box_h, 8 * mm, stroke=1, fill=0)
+
+    c.setFont("Helvetica-Bold", 16)
+    c.drawString(x + 10, y - 25, "Meter Details")
+
+    c.setFont("Helvetica", 11)
+    line_y = y - 50
+    line_gap = 16
+    def draw_kv(label, value):
+        nonlocal line_y
+        c.setFont("Helvetica-Bold", 11)
+        c.drawString(x + 12, line_y, f"{label}:")
+        c.setFont("Helvetica", 11)
+        c.drawString(x + 120, line_y, f"{value}")
+        line_y -= line_gap
+
+    created = doc.get("created_at")
+    updated = doc.get("updated_at")
+    created_s = created.strftime("%Y-%m-%d %H:%M UTC") if created else "-"
+    updated_s = updated.strftime("%Y-%m-%d %H:%M UTC") if updated else "-"
+
+    draw_kv("Meter ID", doc.get("meter_id", "-"))
+    draw_kv("Consumer ID", doc.get("consumer_id", "-"))
+    draw_kv("Value", doc.get("value", "-"))
+    draw_kv("Created", created_s)
+    draw_kv("Updated", updated_s)
+
+    if img_bytes:
+        try:
+            img = ImageReader(io.BytesIO(img_bytes))
+            img_top = line_y - 10
+            max_w = box_w - 24
+            max_h = img_top - (y - box_h) - 20
+            iw, ih = img.getSize()
+            ratio = min(max_w / iw, max_h / ih)
+            disp_w = iw * ratio
+            disp_h = ih * ratio
+            img_x = x + (box_w - disp_w) / 2
+            img_y = (y - box_h) + 20
+            c.drawImage(img, img_x, img_y, width=disp_w, height=disp_h, preserveAspectRatio=True, mask='auto')
+        except Exception:
+            pass
+
+    c.showPage(); c.save()
+    return buf.getvalue()
+
 def build_meter_pdf(doc: dict, img_bytes: Optional[bytes]) -> bytes:
+    """FPDF first (much lighter per document); ReportLab if fpdf2 is missing or fails. Both draw the same layout."""
     try:
-        from reportlab.lib.pagesizes import A4
-        from reportlab.pdfgen import canvas
-        from reportlab.lib.units import mm
-        from reportlab.lib.utils import ImageReader
-        from reportlab.lib import colors
-
-        buf = io.BytesIO()
-        c = canvas.Canvas(buf, pagesize=A4)
-        W, H = A4
-        margin = 18 * mm
-        x = margin
-        y = H - margin
-
-        box_w = W - 2 * margin
-        box_h = H - 2 * margin
-        c.setLineWidth(1.2)
-        c.setStrokeColor(colors.HexColor("#444444"))
-        c.roundRect(x, y - box_h, box_w, box_h, 8 * mm, stroke=1, fill=0)
-
-        c.setFont("Helvetica-Bold", 16)
-        c.drawString(x + 10, y - 25, "Meter Details")
-
-        c.setFont("Helvetica", 11)
-        line_y = y - 50
-        line_gap = 16
-        def draw_kv(label, value):
-            nonlocal line_y
-            c.setFont("Helvetica-Bold", 11)
-            c.drawString(x + 12, line_y, f"{label}:")
-            c.setFont("Helvetica", 11)
-            c.drawString(x + 120, line_y, f"{value}")
-            line_y -= line_gap
-
-        created = doc.get("created_at")
-        updated = doc.get("updated_at")
-        created_s = created.strftime("%Y-%m-%d %H:%M UTC") if created else "-"
-        updated_s = updated.strftime("%Y-%m-%d %H:%M UTC") if updated else "-"
-
-        draw_kv("Meter ID", doc.get("meter_id", "-"))
-        draw_kv("Consumer ID", doc.get("consumer_id", "-"))
-        draw_kv("Value", doc.get("value", "-"))
-        draw_kv("Created", created_s)
-        draw_kv("Updated", updated_s)
-
-        if img_bytes:
-            try:
-                img = ImageReader(io.BytesIO(img_bytes))
-                img_top = line_y - 10
-                max_w = box_w - 24
-                max_h = img_top - (y - box_h) - 20
-                iw, ih = img.getSize()
-                ratio = min(max_w / iw, max_h / ih)
-                disp_w = iw * ratio
-                disp_h = ih * ratio
-                img_x = x + (box_w - disp_w) / 2
-                img_y = (y - box_h) + 20
-                c.drawImage(img, img_x, img_y, width=disp_w, height=disp_h, preserveAspectRatio=True, mask='auto')
-            except Exception:
-                pass
-
-        c.showPage(); c.save()
-        return buf.getvalue()
+        return _fpdf_meter_pdf(doc, img_bytes)
     except Exception:
         try:
-            from fpdf import FPDF
-            pdf = FPDF(orientation="P", unit="mm", format="A4")
-            pdf.add_page()
-            pdf.set_font("Arial", "B", 16); pdf.cell(0, 10, "Meter Details", ln=1)
-            pdf.set_font("Arial", "", 12)
-            def kv(label, value):
-                pdf.set_font("Arial", "B", 12); pdf.cell(40, 8, f"{label}:", ln=0)
-                pdf.set_font("Arial", "", 12); pdf.cell(0, 8, f"{value}", ln=1)
-
-            created = doc.get("created_at"); updated = doc.get("updated_at")
-            created_s = created.strftime("%Y-%m-%d %H:%M UTC") if created else "-"
-            updated_s = updated.strftime("%Y-%m-%d %H:%M UTC") if updated else "-"
-            kv("Meter ID", doc.get("meter_id", "-"))
-            kv("Consumer ID", doc.get("consumer_id", "-"))
-            kv("Value", doc.get("value", "-"))
-            kv("Created", created_s); kv("Updated", updated_s)
-
-            if img_bytes:
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp:
-                    tmp.write(img_bytes); tmp.flush()
-                    pdf.image(tmp.name, x=10, y=None, w=190)
-            return pdf.output(dest="S").encode("latin1")
+            return _reportlab_meter_pdf(doc, img_bytes)
         except Exception as e:
             raise RuntimeError(f"PDF generation requires 'reportlab' or 'fpdf2' package. Error: {e}")
 
+def make_thumb(raw_bytes: bytes) -> Optional[bytes]:
+    """~400px JPEG for the card grid (None if the image can't be decoded); originals are only read for the PDF."""
+    try:
+        # Apply the EXIF orientation first; re-encoding drops the tag browsers rely on
+        im = ImageOps.exif_transpose(Image.open(io.BytesIO(raw_bytes)))
+        im.thumbnail((400, 400))
+        if im.mode in ("RGBA", "LA") or (im.mode == "P" and "transparency" in im.info):
+            # JPEG has no alpha: flatten onto white instead of letting transparency go black
+            im = im.convert("RGBA")
+            bg = Image.new("RGB", im.size, "white")
+            bg.paste(im, mask=im.getchannel("A"))
+            im = bg
+        out = io.BytesIO()
+        im.convert("RGB").save(out, "JPEG", quality=80)
+        return out.getvalue()
+    except Exception:
+        return None
+
+@st.cache_data(max_entries=512, show_spinner=False)
+def _cached_pdf(doc_id_str: str, updated_iso: str, img_id_str: str, doc_blob: dict, _db) -> bytes:
+    """
+    Memoized `build_meter_pdf`, keyed by document version + GridFS file id
+    (files are immutable, so the id stands in for the image bytes). The
+    full-resolution original is only read on a miss; `_db` is not hashed.
+    """
+    img_bytes = _fetch_images(_db, [ObjectId(img_id_str)]).get(img_id_str) if img_id_str else None
+    return build_meter_pdf(doc_blob, img_bytes)
+
 # -------------------------
 # UI Components
 # -------------------------
-def meter_card(doc, fs, db):
-    col1, col2 = st.columns([1, 2], vertical_alignment="center")
-
-    with col1:
-        img_bytes = None
-        if doc.get("image_file_id"):
-            img_bytes = get_image_bytes(fs, doc["image_file_id"])
-            if img_bytes:
-                st.image(img_bytes, caption=f"Meter {doc['meter_id']}", width="stretch")
-            else:
-                st.info("No image available")
-        else:
-            st.info("No image uploaded")
-
-    with col2:
-        st.markdown(f"**Meter ID:** {doc.get('meter_id','-')}")
-        st.markdown(f"**Consumer ID:** {doc.get('consumer_id','-')}")
-        st.markdown(f"**Value:** {doc.get('value','-')}")
-        st.caption(
-            f"Created: {doc.get('created_at').strftime('%Y-%m-%d %H:%M UTC')} • "
-            f"Updated: {doc.get('updated_at').strftime('%Y-%m-%d %H:%M UTC')}"
+def _card_html(doc, thumb_bytes: Optional[bytes]) -> str:
+    """Read-only part of a card (thumbnail, IDs, value, timestamps) as one HTML blob."""
+    if thumb_bytes:
+        b64 = base64.b64encode(thumb_bytes).decode("ascii")
+        media = (
+            f'<figure><img src="data:image/jpeg;base64,{b64}" alt="meter image"/>'
+            f'<figcaption>Meter {html.escape(str(doc.get("meter_id", "-")))}</figcaption></figure>'
         )
+    else:
+        media = f'<div class="meter-noimg">{"No image available" if doc.get("image_file_id") else "No image uploaded"}</div>'
+    created, updated = doc.get("created_at"), doc.get("updated_at")
+    rows = "".join(
+        f"<tr><th>{label}</th><td>{html.escape(str(doc.get(key, '-')))}</td></tr>"
+        for label, key in (("Meter ID", "meter_id"), ("Consumer ID", "consumer_id"), ("Value", "value"))
+    )
+    stamps = (
+        f"Created: {created.strftime('%Y-%m-%d %H:%M UTC') if created else '-'} • "
+        f"Updated: {updated.strftime('%Y-%m-%d %H:%M UTC') if updated else '-'}"
+    )
+    return (
+        f'<div class="meter-card"><div class="meter-media">{media}</div>'
+        f'<div class="meter-meta"><table>{rows}</table><small>{stamps}</small></div></div>'
+    )
 
-        cA, cB = st.columns([1, 1])
-        with cA:
-            with st.expander("Update value"):
-                new_val = st.number_input(
-                    "New reading",
-                    value=float(doc.get("value", 0.0)),
-                    key=f"val_{doc['_id']}",
-                    placeholder="e.g., 0",
-                )
-                if st.button("Save", key=f"save_{doc['_id']}"):
-                    update_value(db, doc["_id"], new_val)
-                    st.success("Value updated."); st.rerun()
-
-        with cB:
-            with st.expander("Delete meter"):
-                st.warning("This will permanently remove this meter and its image.")
-                if st.button("Yes, delete", key=f"del_{doc['_id']}"):
-                    if delete_meter(db, fs, doc["_id"]): st.success("Deleted."); st.rerun()
-                    else: st.error("Delete failed or meter not found.")
-
+def meter_card(doc, thumbs_by_id: dict, fs, db):
+    thumb_bytes = thumbs_by_id.get(str(doc["image_file_id"])) if doc.get("image_file_id") else None
+    # One markdown message for the read-only part; only the actions below are widgets
+    st.markdown(_card_html(doc, thumb_bytes), unsafe_allow_html=True)
+
+    cA, cB = st.columns([1, 1])
+    with cA:
+        with st.expander("Update value"):
+            new_val = st.number_input(
+                "New reading",
+                value=float(doc.get("value", 0.0)),
+                key=f"val_{doc['_id']}",
+                placeholder="e.g., 0",
+            )
+            if st.button("Save", key=f"save_{doc['_id']}"):
+                update_value(db, doc["_id"], new_val)
+                st.session_state.pop("page_cursors_key", None)
+                st.success("Value updated."); st.rerun()
+
+    with cB:
+        with st.expander("Delete meter"):
+            st.warning("This will permanently remove this meter and its image.")
+            if st.button("Yes, delete", key=f"del_{doc['_id']}"):
+                if delete_meter(db, fs, doc["_id"]):
+                    st.session_state.pop("page_cursors_key", None)
+                    st.success("Deleted."); st.rerun()
+                else: st.error("Delete failed or meter not found.")
+
+    # Render the PDF only on request; session state just remembers which doc
+    # version was prepared, the bytes live in the `_cached_pdf` cache
+    updated = doc.get("updated_at")
+    version = updated.isoformat() if updated else ""
+    prepared_key = f"pdfver_{doc['_id']}"
+    prepared = st.session_state.get(prepared_key) == version
+    if st.button("Prepare PDF", key=f"prep_{doc['_id']}", use_container_width=True):
+        st.session_state[prepared_key] = version
+        prepared = True
+    if prepared:
         try:
-            pdf_bytes = build_meter_pdf(doc, img_bytes)
+            pdf_bytes = _cached_pdf(
+                str(doc["_id"]),
+                version,
+                str(doc["image_file_id"]) if doc.get("image_file_id") else "",
+                {k: doc.get(k) for k in ("meter_id", "consumer_id", "value", "created_at", "updated_at")},
+                db,
+            )
             st.download_button(
                 "Download meter as PDF",
                 data=pdf_bytes,
@@ -322,6 +553,14 @@ st.title("📟 Meter Dashboard")
 st.markdown("""
 <style>
 div[data-testid="stNumberInput"] [title="Press Enter to submit form"]{display:none !important;}
+.meter-card{display:flex;gap:1.5rem;align-items:center;}
+.meter-media{flex:1;text-align:center;}
+.meter-media img{max-width:100%;border-radius:0.5rem;}
+.meter-media figcaption,.meter-meta small{color:gray;font-size:0.85rem;}
+.meter-noimg{padding:1rem;border-radius:0.5rem;background:rgba(28,131,225,0.1);}
+.meter-meta{flex:2;}
+.meter-meta table{border:none;margin-bottom:0.5rem;}
+.meter-meta th,.meter-meta td{border:none;padding:0.1rem 0.75rem 0.1rem 0;text-align:left;}
 </style>
 """, unsafe_allow_html=True)
 
@@ -346,21 +585,10 @@ with st.sidebar:
                 if not consumer_id.strip(): raise ValueError("Consumer ID is missing.")
                 if not image_file: raise ValueError("Image is missing.")
                 _id = insert_meter(db, fs, meter_id, consumer_id, value, image_file)
+                st.session_state.pop("page_cursors_key", None)
                 st.success(f"Saved ✓ (id: {_id})"); st.rerun()
             except ValueError as ve:
                 st.error(str(ve))
-            except DuplicateKeyError as de:
-                msg = str(de)
-                if "uniq_meter_norm" in msg:
-                    st.error("Duplicate not allowed: Meter ID already exists")
-                elif "uniq_consumer_norm" in msg:
-                    st.error("Duplicate not allowed: Consumer ID already exists")
-                elif "uniq_meter_id" in msg:
-                    st.error("Duplicate not allowed: exact Meter ID already exists.")
-                elif "uniq_consumer" in msg:
-                    st.error("Duplicate not allowed: exact Consumer ID already exists.")
-                else:
-                    st.error("Duplicate not allowed: same ID(s) exist.")
             except Exception as e:
                 st.error(f"Failed to save: {e}")
 
@@ -376,17 +604,17 @@ with st.sidebar:
 st.subheader("Overview")
 colA, colB = st.columns(2)
 with colA:
-    total_all = db.meters.count_documents({})
+    total_all = db.meters.estimated_document_count()
     st.metric("Total meters (all)", total_all)
 
 # Main: Filters and list
 st.subheader("All Meters")
-q = st.text_input("Search (meter/consumer id)")
+q = st.text_input("Search (meter/consumer id prefix)")
 consumer_filter = st.text_input("Filter by Consumer ID (exact)")
 
 c1, c2, c3, c4 = st.columns([1, 1, 1, 2])
 with c1:
-    sort_by = st.selectbox("Sort by", ["Created", "Meter ID", "Consumer ID", "Value"], index=0)
+    sort_by = st.selectbox("Sort by", list(SORT_FIELDS), index=0)
 with c2:
     sort_dir = st.selectbox("Direction", ["↓", "↑"], index=0)
 with c3:
@@ -394,8 +622,21 @@ with c3:
 with c4:
     page = st.number_input("Page # (0-based)", min_value=0, step=1)
 
-results, total_matching = query_meters(db, q, consumer_filter, sort_by, sort_dir, int(page), int(page_size))
+# Keyset boundaries per page number, valid only for the current query shape
+page_key = (norm(q), norm(consumer_filter), sort_by, sort_dir, int(page_size))
+if st.session_state.get("page_cursors_key") != page_key:
+    st.session_state["page_cursors_key"] = page_key
+    st.session_state["page_cursors"] = {0: None}
+page_cursors = st.session_state["page_cursors"]
+
+results, total_matching = query_meters(
+    db, q, consumer_filter, sort_by, sort_dir, int(page), int(page_size),
+    after=page_cursors.get(int(page)), total_all=total_all,
+)
+if len(results) == page_size:
+    page_cursors[int(page) + 1] = page_boundary(results[-1], sort_spec_for(sort_by, sort_dir))
 pages = math.ceil(total_matching / page_size) if page_size else 1
+thumbs_by_id = get_thumbs(db, [str(d["image_file_id"]) for d in results if d.get("image_file_id")])
 
 with colB:
     st.metric("Matching meters (filtered)", total_matching)
@@ -405,7 +646,7 @@ st.caption(f"Total matching: {total_matching} • Pages: {pages}")
 # Grid display
 for doc in results:
     with st.container(border=True):
-        meter_card(doc, fs, db)
+        meter_card(doc, thumbs_by_id, fs, db)
 
 st.divider()
 st.caption(